@@ -0,0 +1,45 @@
+"""hiring analytics
+
+Revision ID: 0003_hiring_analytics
+Revises: 0002_idempotency_keys
+Create Date: 2026-10-19
+
+"""
+
+from alembic import op
+
+revision = "0003_hiring_analytics"
+down_revision = "0002_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_employees_department_hired_at", "employees", ["department_id", "hired_at"])
+    op.drop_index("ix_employees_department_id", table_name="employees")
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW employee_hiring_stats AS
+        SELECT department_id,
+               date_trunc('month', hired_at)::date AS hired_month,
+               position,
+               count(*)::integer AS headcount
+        FROM employees
+        GROUP BY department_id, date_trunc('month', hired_at)::date, position
+        """
+    )
+    op.execute(
+        """
+        CREATE UNIQUE INDEX uq_employee_hiring_stats
+        ON employee_hiring_stats (department_id, hired_month, position)
+        NULLS NOT DISTINCT
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW employee_hiring_stats")
+
+    op.create_index("ix_employees_department_id", "employees", ["department_id"])
+    op.drop_index("ix_employees_department_hired_at", table_name="employees")
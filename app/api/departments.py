@@ -1,42 +1,67 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_session
-from app.schemas.department import (DepartmentCreate, DepartmentOut,
-                                    DepartmentTree, DepartmentUpdate)
-from app.schemas.employee import EmployeeCreate, EmployeeOut
+from app.api.dependencies import (admit, admit_tree, get_idempotency,
+                                  get_session)
+from app.core.admission import record_tree_size
+from app.schemas.analytics import HiringAnalytics
+from app.schemas.department import (DepartmentCreate, DepartmentMerge,
+                                    DepartmentOut, DepartmentTree,
+                                    DepartmentUpdate, MergeOut)
+from app.schemas.employee import (EmployeeCreate, EmployeeOut,
+                                  EmployeeTransfer, TransferOut)
+from app.services.analytics_service import AnalyticsService
 from app.services.department_service import DepartmentService
 from app.services.employee_service import EmployeeService
+from app.services.idempotency_service import IdempotencyService
 
 router = APIRouter(prefix="/departments", tags=["departments"])
 
 
 @router.post("/",
              response_model=DepartmentOut,
-             status_code=status.HTTP_201_CREATED)
+             status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(admit("write"))])
 async def create_department(
     payload: DepartmentCreate,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    idempotency: IdempotencyService = Depends(get_idempotency),
 ) -> DepartmentOut:
+    stored = await idempotency.begin("POST /departments/", payload)
+    if stored is not None:
+        return JSONResponse(stored.body, status_code=stored.status_code)
+
     service = DepartmentService(session)
     try:
         dep = await service.create(name=payload.name,
-                                   parent_id=payload.parent_id)
+                                   parent_id=payload.parent_id,
+                                   commit=False)
     except KeyError:
         return Response(status_code=status.HTTP_404_NOT_FOUND)
-    return DepartmentOut.model_validate(dep)
+    out = DepartmentOut.model_validate(dep)
+    await idempotency.complete(status.HTTP_201_CREATED, out)
+    await session.commit()
+    return out
 
 
 @router.post("/{dep_id}/employees/",
              response_model=EmployeeOut,
-             status_code=status.HTTP_201_CREATED)
+             status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(admit("write"))])
 async def create_employee(
     dep_id: int,
     payload: EmployeeCreate,
     session: AsyncSession = Depends(get_session),
+    idempotency: IdempotencyService = Depends(get_idempotency),
 ) -> EmployeeOut:
+    stored = await idempotency.begin(f"POST /departments/{dep_id}/employees/",
+                                     payload)
+    if stored is not None:
+        return JSONResponse(stored.body, status_code=stored.status_code)
+
     service = EmployeeService(session)
     try:
         emp = await service.create(
@@ -44,13 +69,55 @@ async def create_employee(
             full_name=payload.full_name,
             position=payload.position,
             hired_at=payload.hired_at,
+            commit=False,
         )
     except KeyError:
         return Response(status_code=status.HTTP_404_NOT_FOUND)
-    return EmployeeOut.model_validate(emp)
+    out = EmployeeOut.model_validate(emp)
+    await idempotency.complete(status.HTTP_201_CREATED, out)
+    await session.commit()
+    return out
 
 
-@router.get("/{dep_id}", response_model=DepartmentTree)
+@router.post("/{dep_id}/employees/transfer",
+             response_model=TransferOut,
+             dependencies=[Depends(admit("write"))])
+async def transfer_employees(
+    dep_id: int,
+    payload: EmployeeTransfer,
+    session: AsyncSession = Depends(get_session),
+) -> TransferOut:
+    service = DepartmentService(session)
+    try:
+        result = await service.transfer_employees(
+            dep_id,
+            employee_ids=payload.employee_ids,
+            from_department_id=payload.from_department_id,
+            position=payload.position,
+        )
+    except KeyError:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return TransferOut.model_validate(result)
+
+
+@router.get("/{dep_id}/analytics",
+            response_model=HiringAnalytics,
+            dependencies=[Depends(admit("analytics"))])
+async def get_hiring_analytics(
+    dep_id: int,
+    session: AsyncSession = Depends(get_session),
+) -> HiringAnalytics:
+    service = AnalyticsService(session)
+    try:
+        stats = await service.hiring(dep_id)
+    except KeyError:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return HiringAnalytics.model_validate(stats)
+
+
+@router.get("/{dep_id}",
+            response_model=DepartmentTree,
+            dependencies=[Depends(admit_tree)])
 async def get_department(
     dep_id: int,
     depth: int = Query(default=1, ge=1, le=5),
@@ -64,6 +131,7 @@ async def get_department(
                                       include_employees=include_employees)
     except KeyError:
         return Response(status_code=status.HTTP_404_NOT_FOUND)
+    record_tree_size(dep_id, depth, include_employees, _count_rows(tree))
 
     return DepartmentTree(
         department=DepartmentOut.model_validate(tree["department"]),
@@ -82,7 +150,14 @@ def _tree_to_schema(node) -> DepartmentTree:
     )
 
 
-@router.patch("/{dep_id}", response_model=DepartmentOut)
+def _count_rows(node) -> int:
+    return (1 + len(node["employees"])
+            + sum(_count_rows(ch) for ch in node["children"]))
+
+
+@router.patch("/{dep_id}",
+              response_model=DepartmentOut,
+              dependencies=[Depends(admit("write"))])
 async def patch_department(
     dep_id: int,
     payload: DepartmentUpdate,
@@ -98,7 +173,26 @@ async def patch_department(
     return DepartmentOut.model_validate(dep)
 
 
-@router.delete("/{dep_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.post("/{dep_id}/merge",
+             response_model=MergeOut,
+             dependencies=[Depends(admit("write"))])
+async def merge_department(
+    dep_id: int,
+    payload: DepartmentMerge,
+    session: AsyncSession = Depends(get_session),
+) -> MergeOut:
+    service = DepartmentService(session)
+    try:
+        result = await service.merge(dep_id,
+                                     into_id=payload.into_department_id)
+    except KeyError:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return MergeOut.model_validate(result)
+
+
+@router.delete("/{dep_id}",
+               status_code=status.HTTP_204_NO_CONTENT,
+               dependencies=[Depends(admit("write"))])
 async def delete_department(
     dep_id: int,
     mode: str = Query(default="cascade", pattern="^(cascade|reassign)$"),
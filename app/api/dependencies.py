@@ -1,10 +1,48 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable
 
+from fastapi import Depends, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.admission import limiters, tree_route_class
 from app.db.session import SessionLocal
+from app.services.idempotency_service import IdempotencyService
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
         yield session
+
+
+async def get_idempotency(
+    idempotency_key: str | None = Header(default=None,
+                                         min_length=1,
+                                         max_length=255),
+    session: AsyncSession = Depends(get_session),
+) -> AsyncGenerator[IdempotencyService, None]:
+    idempotency = IdempotencyService(session, key=idempotency_key)
+    try:
+        yield idempotency
+    finally:
+        await idempotency.release()
+
+
+def admit(route_class: str) -> Callable[[], AsyncGenerator[None, None]]:
+    limiter = limiters[route_class]
+
+    async def dependency() -> AsyncGenerator[None, None]:
+        async with limiter.acquire():
+            yield
+
+    return dependency
+
+
+async def admit_tree(
+    dep_id: int,
+    depth: int = Query(default=1, ge=1, le=5),
+    include_employees: bool = Query(default=True),
+) -> AsyncGenerator[None, None]:
+    route_class = tree_route_class(dep_id,
+                                   depth=depth,
+                                   include_employees=include_employees)
+    async with limiters[route_class].acquire():
+        yield
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+from app.exceptions import OverloadedError
+
+
+class AdmissionLimiter:
+    """Weighted FIFO semaphore with a bounded wait queue.
+
+    Requests hold ``cost`` units of ``capacity`` while they run. A request
+    that cannot be admitted immediately waits in line; when the line is
+    full or the wait exceeds ``timeout`` it is shed with 503. Costs are
+    clamped to ``capacity`` so a single heavy request still gets through,
+    and FIFO order keeps it from being starved by cheap ones.
+    """
+
+    def __init__(self,
+                 name: str,
+                 *,
+                 capacity: int,
+                 max_queue: int,
+                 timeout: float):
+        self.name = name
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._available = capacity
+        self._waiters: deque[tuple[int, asyncio.Future[None]]] = deque()
+
+    @asynccontextmanager
+    async def acquire(self, cost: int = 1) -> AsyncIterator[None]:
+        cost = min(max(cost, 1), self.capacity)
+        await self._acquire(cost)
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    async def _acquire(self, cost: int) -> None:
+        if not self._waiters and self._available >= cost:
+            self._available -= cost
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise self._overloaded("queue is full")
+
+        waiter: asyncio.Future[None] = (
+            asyncio.get_running_loop().create_future()
+            )
+        entry = (cost, waiter)
+        self._waiters.append(entry)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                self._release(cost)
+            else:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                self._wake()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._overloaded("queue timeout") from e
+
+    def _release(self, cost: int) -> None:
+        self._available += cost
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            cost, waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if cost > self._available:
+                return
+            self._waiters.popleft()
+            self._available -= cost
+            waiter.set_result(None)
+
+    def _overloaded(self, reason: str) -> OverloadedError:
+        return OverloadedError(
+            f"Service overloaded ({self.name}: {reason})",
+            retry_after=settings.admission_retry_after_seconds,
+        )
+
+
+limiters: dict[str, AdmissionLimiter] = {
+    "read": AdmissionLimiter(
+        "read",
+        capacity=settings.admission_read_capacity,
+        max_queue=settings.admission_read_queue,
+        timeout=settings.admission_read_timeout_ms / 1000,
+    ),
+    "expensive_read": AdmissionLimiter(
+        "expensive_read",
+        capacity=settings.admission_expensive_read_capacity,
+        max_queue=settings.admission_expensive_read_queue,
+        timeout=settings.admission_expensive_read_timeout_ms / 1000,
+    ),
+    "analytics": AdmissionLimiter(
+        "analytics",
+        capacity=settings.admission_analytics_capacity,
+        max_queue=settings.admission_analytics_queue,
+        timeout=settings.admission_analytics_timeout_ms / 1000,
+    ),
+    "write": AdmissionLimiter(
+        "write",
+        capacity=settings.admission_write_capacity,
+        max_queue=settings.admission_write_queue,
+        timeout=settings.admission_write_timeout_ms / 1000,
+    ),
+    "health": AdmissionLimiter(
+        "health",
+        capacity=settings.admission_health_capacity,
+        max_queue=settings.admission_health_queue,
+        timeout=settings.admission_health_timeout_ms / 1000,
+    ),
+}
+
+
+_tree_sizes: OrderedDict[tuple[int, int, bool], int] = OrderedDict()
+
+
+def record_tree_size(dep_id: int,
+                     depth: int,
+                     include_employees: bool,
+                     rows: int) -> None:
+    key = (dep_id, depth, include_employees)
+    _tree_sizes[key] = rows
+    _tree_sizes.move_to_end(key)
+    while len(_tree_sizes) > settings.admission_tree_size_cache_entries:
+        _tree_sizes.popitem(last=False)
+
+
+def tree_route_class(dep_id: int,
+                     *,
+                     depth: int,
+                     include_employees: bool) -> str:
+    rows = _tree_sizes.get((dep_id, depth, include_employees))
+    if rows is None:
+        # never served from this worker: only shallow trees count as cheap
+        cheap = depth <= settings.admission_tree_cheap_depth
+    else:
+        cheap = rows <= settings.admission_tree_cheap_rows
+    return "read" if cheap else "expensive_read"
@@ -1,5 +1,18 @@
+import asyncio
+import json
+import random
+import re
 import sys
+import time
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import Request, Response
 from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 from app.core.config import settings
 
@@ -13,3 +26,168 @@ def configure_logging() -> None:
         diagnose=False,
         enqueue=True,
     )
+
+
+@dataclass
+class _Statement:
+    sql: str
+    parameters: Any
+    duration_ms: float
+    error: str | None = None
+
+
+@dataclass
+class _RequestStats:
+    statements: list[_Statement] = field(default_factory=list)
+
+
+_request_stats: ContextVar[_RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+_explain_tasks: set[asyncio.Task[None]] = set()
+
+_WRITES_OR_LOCKS = re.compile(
+    r"\b(insert|update|delete|merge)\b"
+    r"|\bfor\s+(no\s+key\s+)?update\b"
+    r"|\bfor\s+(key\s+)?share\b",
+    re.IGNORECASE,
+)
+
+
+def track_statements(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    # the start time lives on the execution context, which is discarded
+    # with the statement even when it fails
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._slow_log_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = context._slow_log_started
+        stats = _request_stats.get()
+        if stats is None:
+            return
+        stats.statements.append(_Statement(
+            sql=statement,
+            parameters=parameters,
+            duration_ms=(time.perf_counter() - started) * 1000,
+        ))
+
+    # failed statements (timeouts, deadlocks) never reach after_cursor_execute
+    # but are often the ones that made the request slow
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        context = exception_context.execution_context
+        started = getattr(context, "_slow_log_started", None)
+        stats = _request_stats.get()
+        if stats is None or started is None:
+            return
+        stats.statements.append(_Statement(
+            sql=exception_context.statement or "",
+            parameters=exception_context.parameters,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            error=type(exception_context.original_exception).__name__,
+        ))
+
+
+def slow_request_middleware(
+    engine: AsyncEngine,
+) -> Callable[[Request, Callable[[Request], Awaitable[Response]]],
+              Awaitable[Response]]:
+    async def middleware(
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            _request_stats.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= settings.slow_request_threshold_ms:
+                _log_slow_request(engine, request, status_code, stats,
+                                  elapsed_ms)
+        return response
+
+    return middleware
+
+
+def _log_slow_request(engine: AsyncEngine,
+                      request: Request,
+                      status_code: int,
+                      stats: _RequestStats,
+                      elapsed_ms: float) -> None:
+    route = request.scope.get("route")
+    slowest = sorted(stats.statements,
+                     key=lambda s: s.duration_ms,
+                     reverse=True)[:settings.slow_log_top_statements]
+    record = {
+        "event": "slow_request",
+        "method": request.method,
+        "route": getattr(route, "path", request.url.path),
+        "path_params": request.path_params,
+        "query_params": dict(request.query_params),
+        "status_code": status_code,
+        "duration_ms": round(elapsed_ms, 1),
+        "statement_count": len(stats.statements),
+        "db_time_ms": round(sum(s.duration_ms for s in stats.statements), 1),
+        "slowest_statements": [
+            {"sql": s.sql[:settings.slow_log_max_sql_length],
+             "duration_ms": round(s.duration_ms, 1),
+             "error": s.error}
+            for s in slowest
+        ],
+    }
+    logger.warning(json.dumps(record, default=str))
+
+    for s in slowest:
+        if (s.duration_ms >= settings.slow_query_threshold_ms
+                and s.error is None
+                and _is_read_only(s.sql)
+                and len(_explain_tasks) < settings.slow_explain_max_concurrency
+                and random.random() < settings.slow_explain_sample_rate):
+            task = asyncio.create_task(_explain(engine, record["route"], s))
+            _explain_tasks.add(task)
+            task.add_done_callback(_explain_tasks.discard)
+
+
+def _is_read_only(sql: str) -> bool:
+    if not sql.lstrip().lower().startswith(("select", "with")):
+        return False
+    # EXPLAIN ANALYZE executes the statement: skip data-modifying CTEs
+    # and row-locking reads
+    return _WRITES_OR_LOCKS.search(sql) is None
+
+
+async def _explain(engine: AsyncEngine,
+                   route: str,
+                   statement: _Statement) -> None:
+    try:
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql(
+                "SELECT set_config('statement_timeout', "
+                f"'{settings.slow_explain_timeout_ms}ms', true)"
+            )
+            result = await conn.exec_driver_sql(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement.sql,
+                statement.parameters,
+            )
+            plan = result.scalar_one()
+            await conn.rollback()
+    except Exception:
+        logger.exception("EXPLAIN of slow statement failed")
+        return
+
+    logger.warning(json.dumps({
+        "event": "slow_query_plan",
+        "route": route,
+        "sql": statement.sql[:settings.slow_log_max_sql_length],
+        "duration_ms": round(statement.duration_ms, 1),
+        "plan": plan,
+    }, default=str))
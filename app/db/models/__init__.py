@@ -1,4 +1,6 @@
 from app.db.models.department import Department
 from app.db.models.employee import Employee
+from app.db.models.hiring_stats import employee_hiring_stats
+from app.db.models.idempotency_key import IdempotencyKey
 
-__all__ = ["Department", "Employee"]
+__all__ = ["Department", "Employee", "IdempotencyKey", "employee_hiring_stats"]
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import date, datetime
 
-from sqlalchemy import Date, DateTime, ForeignKey, String, func
+from sqlalchemy import Date, DateTime, ForeignKey, Index, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -15,7 +15,6 @@ class Employee(Base):
     department_id: Mapped[int] = mapped_column(
         ForeignKey("departments.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
     full_name: Mapped[str] = mapped_column(String(200), nullable=False)
     position: Mapped[str] = mapped_column(String(200), nullable=False)
@@ -27,3 +26,7 @@ class Employee(Base):
     )
 
     department = relationship("Department", back_populates="employees")
+
+    __table_args__ = (
+        Index("ix_employees_department_hired_at", department_id, hired_at),
+    )
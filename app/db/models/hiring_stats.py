@@ -0,0 +1,11 @@
+from sqlalchemy import Date, Integer, String, column, table
+
+# Materialized view created by migration 0003; not part of Base.metadata
+# so that autogenerate does not try to manage it as a table.
+employee_hiring_stats = table(
+    "employee_hiring_stats",
+    column("department_id", Integer),
+    column("hired_month", Date),
+    column("position", String(200)),
+    column("headcount", Integer),
+)
@@ -6,6 +6,8 @@ from app.core.config import settings
 engine: AsyncEngine = create_async_engine(
     settings.database_url,
     pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
 )
 
 SessionLocal = async_sessionmaker(
@@ -2,5 +2,21 @@ from fastapi import HTTPException, status
 
 
 class ConflictError(HTTPException):
-    def __init__(self, detail: str = "Conflict"):
-        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+    def __init__(self,
+                 detail: str = "Conflict",
+                 retry_after: int | None = None):
+        headers = None
+        if retry_after is not None:
+            headers = {"Retry-After": str(retry_after)}
+        super().__init__(status_code=status.HTTP_409_CONFLICT,
+                         detail=detail,
+                         headers=headers)
+
+
+class OverloadedError(HTTPException):
+    def __init__(self,
+                 detail: str = "Service overloaded",
+                 retry_after: int = 1):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail=detail,
+                         headers={"Retry-After": str(retry_after)})
@@ -1,15 +1,61 @@
-from fastapi import FastAPI
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
+from loguru import logger
 
 from app.api.departments import router as departments_router
-from app.core.logger import configure_logging
+from app.api.dependencies import admit
+from app.core.config import settings
+from app.core.logger import (configure_logging, slow_request_middleware,
+                             track_statements)
+from app.db.session import SessionLocal, engine
+from app.services.analytics_service import AnalyticsService
+from app.services.idempotency_service import IdempotencyService
 
 configure_logging()
+track_statements(engine)
+
+
+async def _sweep_idempotency_keys() -> None:
+    while True:
+        await asyncio.sleep(settings.idempotency_sweep_interval_seconds)
+        try:
+            async with SessionLocal() as session:
+                removed = await IdempotencyService(session).sweep()
+            logger.debug("Swept {} expired idempotency keys", removed)
+        except Exception:
+            logger.exception("Idempotency key sweep failed")
+
+
+async def _refresh_hiring_stats() -> None:
+    while True:
+        await asyncio.sleep(settings.analytics_refresh_interval_seconds)
+        try:
+            async with SessionLocal() as session:
+                await AnalyticsService(session).refresh_hiring_stats()
+            logger.debug("Refreshed employee_hiring_stats")
+        except Exception:
+            logger.exception("Hiring stats refresh failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    tasks = [asyncio.create_task(_sweep_idempotency_keys())]
+    if settings.analytics_use_materialized_view:
+        tasks.append(asyncio.create_task(_refresh_hiring_stats()))
+    yield
+    for task in tasks:
+        task.cancel()
+
 
-app = FastAPI(title="Org Structure API", version="1.0.0")
+app = FastAPI(title="Org Structure API", version="1.0.0", lifespan=lifespan)
 
+app.middleware("http")(slow_request_middleware(engine))
 app.include_router(departments_router)
 
 
-@app.get("/health")
+@app.get("/health", dependencies=[Depends(admit("health"))])
 async def health() -> dict[str, str]:
     return {"status": "ok"}
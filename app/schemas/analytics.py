@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class MonthlyHires(BaseModel):
+    month: date
+    hires: int
+
+
+class TenureBucket(BaseModel):
+    bucket: str
+    employees: int
+
+
+class PositionCount(BaseModel):
+    position: str
+    employees: int
+
+
+class HiringAnalytics(BaseModel):
+    department_id: int
+    total_employees: int
+    unknown_hired_at: int
+    # tenure counted from the first day of the hiring month (view-backed)
+    tenure_month_precision: bool = False
+    hires_per_month: list[MonthlyHires] = []
+    tenure: list[TenureBucket] = []
+    positions: list[PositionCount] = []
@@ -45,6 +45,20 @@ class DepartmentOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class DepartmentMerge(BaseModel):
+    into_department_id: int
+
+
+class MergeOut(BaseModel):
+    merged_department_id: int
+    into_department_id: int
+    moved_employees: int
+    moved_departments: int
+    merged_departments: int
+
+    model_config = {"from_attributes": True}
+
+
 class DepartmentTree(BaseModel):
     department: DepartmentOut
     employees: list["EmployeeOut"] = []
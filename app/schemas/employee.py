@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import date, datetime
 from typing import Annotated
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 Text200 = Annotated[str, Field(min_length=1, max_length=200)]
 
@@ -31,3 +31,37 @@ class EmployeeOut(BaseModel):
     created_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class EmployeeTransfer(BaseModel):
+    employee_ids: list[int] | None = Field(default=None, min_length=1)
+    from_department_id: int | None = None
+    position: Text200 | None = None
+
+    @field_validator("position")
+    @classmethod
+    def trim_position(cls, v: str | None) -> str | None:
+        if v is None:
+            return None
+        v = v.strip()
+        if not v:
+            raise ValueError("must not be empty")
+        return v
+
+    @model_validator(mode="after")
+    def check_selector(self) -> EmployeeTransfer:
+        if (self.employee_ids is None) == (self.from_department_id is None):
+            raise ValueError(
+                "exactly one of employee_ids or from_department_id "
+                "is required"
+                )
+        if self.position is not None and self.from_department_id is None:
+            raise ValueError("position requires from_department_id")
+        return self
+
+
+class TransferOut(BaseModel):
+    target_department_id: int
+    transferred: int
+
+    model_config = {"from_attributes": True}
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import (Date, Integer, case, cast, extract, func,
+                        literal_column, select, text)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Department, Employee, employee_hiring_stats
+from app.services.department_service import DepartmentService
+
+
+class AnalyticsService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def hiring(self, dep_id: int) -> dict[str, Any]:
+        root = await self.session.get(Department, dep_id)
+        if root is None:
+            raise KeyError("department not found")
+
+        subtree = DepartmentService.subtree_cte(dep_id)
+        from_view = settings.analytics_use_materialized_view
+        if from_view:
+            # the view keeps month precision only, so tenure is measured
+            # from the first day of the hiring month
+            stats = employee_hiring_stats
+            base = (
+                select(stats.c.hired_month,
+                       stats.c.hired_month.label("tenure_from"),
+                       stats.c.position,
+                       stats.c.headcount)
+                .where(stats.c.department_id.in_(select(subtree.c.id)))
+            )
+        else:
+            base = (
+                select(
+                    cast(func.date_trunc(literal_column("'month'"),
+                                         Employee.hired_at),
+                         Date).label("hired_month"),
+                    Employee.hired_at.label("tenure_from"),
+                    Employee.position,
+                    literal_column("1").label("headcount"),
+                )
+                .where(Employee.department_id.in_(select(subtree.c.id)))
+            )
+        base = base.subquery("base")
+
+        years = extract("year", func.age(func.current_date(),
+                                         base.c.tenure_from))
+        bucketed = select(
+            base.c.hired_month,
+            base.c.position,
+            base.c.headcount,
+            case(
+                (base.c.tenure_from.is_(None), None),
+                (years < 1, "<1y"),
+                (years < 3, "1-3y"),
+                (years < 5, "3-5y"),
+                (years < 10, "5-10y"),
+                else_="10y+",
+            ).label("tenure"),
+        ).subquery("bucketed")
+
+        rows = (await self.session.execute(
+            select(
+                bucketed.c.hired_month,
+                bucketed.c.tenure,
+                bucketed.c.position,
+                cast(func.sum(bucketed.c.headcount),
+                     Integer).label("employees"),
+                func.grouping(bucketed.c.hired_month).label("by_month"),
+                func.grouping(bucketed.c.tenure).label("by_tenure"),
+            )
+            .group_by(func.grouping_sets(bucketed.c.hired_month,
+                                         bucketed.c.tenure,
+                                         bucketed.c.position))
+        )).all()
+
+        hires_per_month: list[dict[str, Any]] = []
+        tenure_buckets: list[dict[str, Any]] = []
+        positions: list[dict[str, Any]] = []
+        unknown_hired_at = 0
+        for r in rows:
+            if r.by_month == 0:
+                if r.hired_month is None:
+                    unknown_hired_at = r.employees
+                else:
+                    hires_per_month.append({"month": r.hired_month,
+                                            "hires": r.employees})
+            elif r.by_tenure == 0:
+                if r.tenure is not None:
+                    tenure_buckets.append({"bucket": r.tenure,
+                                           "employees": r.employees})
+            else:
+                positions.append({"position": r.position,
+                                  "employees": r.employees})
+
+        bucket_order = ["<1y", "1-3y", "3-5y", "5-10y", "10y+"]
+        return {
+            "department_id": dep_id,
+            "total_employees": sum(p["employees"] for p in positions),
+            "unknown_hired_at": unknown_hired_at,
+            "tenure_month_precision": from_view,
+            "hires_per_month": sorted(hires_per_month,
+                                      key=lambda m: m["month"]),
+            "tenure": sorted(tenure_buckets,
+                             key=lambda b: bucket_order.index(b["bucket"])),
+            "positions": sorted(positions,
+                                key=lambda p: (-p["employees"],
+                                               p["position"])),
+        }
+
+    async def refresh_hiring_stats(self) -> None:
+        await self.session.execute(
+            text("REFRESH MATERIALIZED VIEW CONCURRENTLY "
+                 "employee_hiring_stats")
+        )
+        await self.session.commit()
@@ -3,8 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any
 
-from sqlalchemy import (Integer, Select, and_, func, literal, select,
-                        update)
+from sqlalchemy import (CTE, Integer, Select, and_, case, delete, func,
+                        literal, select, update)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -19,11 +19,30 @@ class DeleteResult:
     reassigned_to: int | None = None
 
 
+@dataclass(frozen=True)
+class TransferResult:
+    target_department_id: int
+    transferred: int
+
+
+@dataclass(frozen=True)
+class MergeResult:
+    merged_department_id: int
+    into_department_id: int
+    moved_employees: int
+    moved_departments: int
+    merged_departments: int
+
+
 class DepartmentService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create(self, *, name: str, parent_id: int | None) -> Department:
+    async def create(self,
+                     *,
+                     name: str,
+                     parent_id: int | None,
+                     commit: bool = True) -> Department:
         name = name.strip()
         if parent_id is not None:
             parent = await self.session.get(Department, parent_id)
@@ -38,7 +57,10 @@ class DepartmentService:
         dep = Department(name=name, parent_id=parent_id)
         self.session.add(dep)
         try:
-            await self.session.commit()
+            if commit:
+                await self.session.commit()
+            else:
+                await self.session.flush()
         except IntegrityError as e:
             await self.session.rollback()
             raise ConflictError(
@@ -137,6 +159,139 @@ class DepartmentService:
                             mode=mode,
                             reassigned_to=reassign_to_department_id)
 
+    async def transfer_employees(self,
+                                 target_id: int,
+                                 *,
+                                 employee_ids: list[int] | None = None,
+                                 from_department_id: int | None = None,
+                                 position: str | None = None
+                                 ) -> TransferResult:
+        target = await self.session.get(Department, target_id)
+        if target is None:
+            raise KeyError("target department not found")
+
+        stmt = (
+            update(Employee)
+            .where(Employee.department_id != target_id)
+            .values(department_id=target_id)
+            .execution_options(synchronize_session=False)
+        )
+        if employee_ids is not None:
+            stmt = stmt.where(Employee.id.in_(employee_ids))
+        else:
+            if from_department_id is None:
+                raise ValueError(
+                    "employee_ids or from_department_id is required"
+                    )
+            source = await self.session.get(Department, from_department_id)
+            if source is None:
+                raise KeyError("source department not found")
+            subtree = self.subtree_cte(from_department_id)
+            stmt = stmt.where(
+                Employee.department_id.in_(select(subtree.c.id))
+                )
+            if position is not None:
+                stmt = stmt.where(Employee.position == position.strip())
+
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return TransferResult(target_department_id=target_id,
+                              transferred=result.rowcount)
+
+    async def merge(self, dep_id: int, *, into_id: int) -> MergeResult:
+        if dep_id == into_id:
+            raise ConflictError("Cannot merge department into itself")
+
+        dep = await self.session.get(Department, dep_id)
+        if dep is None:
+            raise KeyError("department not found")
+        into = await self.session.get(Department, into_id)
+        if into is None:
+            raise KeyError("target department not found")
+
+        if await self._would_create_cycle(dep_id=dep_id,
+                                          new_parent_id=into_id):
+            raise ConflictError(
+                "Cannot merge department into its own subtree"
+                )
+
+        dep_tbl = Department.__table__
+        emp_tbl = Employee.__table__
+        src = dep_tbl.alias("src")
+        dst = dep_tbl.alias("dst")
+
+        mapping = {dep_id: into_id}
+        merged: list[int] = []
+        moved_employees = 0
+        moved_departments = 0
+        try:
+            # dep is about to be removed but keeps its place until the end;
+            # free its name so a same-named department can move in next to
+            # it when a counterpart is one of its ancestors
+            await self.session.execute(
+                update(dep_tbl)
+                .where(dep_tbl.c.id == dep_id)
+                .values(name=f"#merging-{dep_id}")
+            )
+
+            while mapping:
+                sources = list(mapping)
+                merged.extend(sources)
+                counterpart = case(mapping, value=dep_tbl.c.parent_id)
+
+                # children whose name is taken under the counterpart are
+                # merged into that sibling on the next pass
+                conflicts = (await self.session.execute(
+                    select(src.c.id, dst.c.id)
+                    .join(dst, and_(
+                        dst.c.name == src.c.name,
+                        dst.c.parent_id == case(mapping,
+                                                value=src.c.parent_id),
+                    ))
+                    .where(src.c.parent_id.in_(sources))
+                    .where(dst.c.id.not_in(merged))
+                )).all()
+                next_mapping = {s_id: d_id for s_id, d_id in conflicts}
+
+                moved_employees += (await self.session.execute(
+                    update(emp_tbl)
+                    .where(emp_tbl.c.department_id.in_(sources))
+                    .values(department_id=case(
+                        mapping, value=emp_tbl.c.department_id
+                        ))
+                )).rowcount
+
+                reparent = (
+                    update(dep_tbl)
+                    .where(dep_tbl.c.parent_id.in_(sources))
+                    .values(parent_id=counterpart)
+                )
+                if next_mapping:
+                    reparent = reparent.where(
+                        dep_tbl.c.id.not_in(list(next_mapping))
+                        )
+                moved_departments += (
+                    await self.session.execute(reparent)
+                    ).rowcount
+
+                mapping = next_mapping
+
+            await self.session.execute(
+                delete(dep_tbl).where(dep_tbl.c.id.in_(merged))
+            )
+            await self.session.commit()
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise ConflictError(
+                "Department name must be unique within the same parent"
+                ) from e
+
+        return MergeResult(merged_department_id=dep_id,
+                           into_department_id=into_id,
+                           moved_employees=moved_employees,
+                           moved_departments=moved_departments,
+                           merged_departments=len(merged))
+
     async def get_tree(self,
                        dep_id: int,
                        *,
@@ -151,23 +306,7 @@ class DepartmentService:
         if root is None:
             raise KeyError("department not found")
 
-        lvl = literal(0, type_=Integer).label("lvl")
-        cte = (
-            select(Department.id, Department.parent_id, lvl)
-            .where(Department.id == dep_id)
-            .cte(name="dept_tree", recursive=True)
-        )
-        cte_alias = cte.alias()
-        dep_tbl = Department.__table__
-
-        cte = cte.union_all(
-            select(dep_tbl.c.id,
-                   dep_tbl.c.parent_id,
-                   (cte_alias.c.lvl + 1).label("lvl"))
-            .where(dep_tbl.c.parent_id == cte_alias.c.id)
-            .where(cte_alias.c.lvl < depth)
-        )
-
+        cte = self.subtree_cte(dep_id, depth=depth)
         rows = (await self.session.execute(select(cte.c.id,
                                                   cte.c.parent_id,
                                                   cte.c.lvl))).all()
@@ -208,6 +347,27 @@ class DepartmentService:
 
         return build(dep_id)
 
+    @staticmethod
+    def subtree_cte(dep_id: int, *, depth: int | None = None) -> CTE:
+        lvl = literal(0, type_=Integer).label("lvl")
+        cte = (
+            select(Department.id, Department.parent_id, lvl)
+            .where(Department.id == dep_id)
+            .cte(name="dept_tree", recursive=True)
+        )
+        cte_alias = cte.alias()
+        dep_tbl = Department.__table__
+
+        recursive = (
+            select(dep_tbl.c.id,
+                   dep_tbl.c.parent_id,
+                   (cte_alias.c.lvl + 1).label("lvl"))
+            .where(dep_tbl.c.parent_id == cte_alias.c.id)
+        )
+        if depth is not None:
+            recursive = recursive.where(cte_alias.c.lvl < depth)
+        return cte.union_all(recursive)
+
     async def _name_exists(self,
                            *,
                            name: str,
@@ -14,7 +14,8 @@ class EmployeeService:
                      *,
                      full_name: str,
                      position: str,
-                     hired_at) -> Employee:
+                     hired_at,
+                     commit: bool = True) -> Employee:
         dep = await self.session.get(Department, dep_id)
         if dep is None:
             raise KeyError("department not found")
@@ -26,6 +27,9 @@ class EmployeeService:
             hired_at=hired_at,
         )
         self.session.add(emp)
-        await self.session.commit()
+        if commit:
+            await self.session.commit()
+        else:
+            await self.session.flush()
         await self.session.refresh(emp)
         return emp
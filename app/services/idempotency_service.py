@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import ColumnElement, and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import IdempotencyKey
+from app.exceptions import ConflictError
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+# wakes duplicates waiting in this worker as soon as the owner finishes;
+# duplicates served by other workers fall back to polling
+_key_events: dict[str, asyncio.Event] = {}
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    body: Any
+
+
+class IdempotencyService:
+    """Replays stored responses for repeated ``Idempotency-Key`` requests.
+
+    ``begin`` commits an in-progress row for the key. The caller then does
+    its write without committing, records the response with ``complete``
+    and commits both in one transaction. A duplicate that arrives while the
+    key is in progress waits for the owner without holding a connection,
+    then replays the stored response; it gets 409 with Retry-After only
+    if the wait times out.
+    """
+
+    def __init__(self, session: AsyncSession, *, key: str | None = None):
+        self.session = session
+        self.key = key
+        self._owned = False
+        self._owned_at: datetime | None = None
+        self._fingerprint: str | None = None
+        self._event: asyncio.Event | None = None
+
+    async def begin(self,
+                    scope: str,
+                    payload: BaseModel) -> StoredResponse | None:
+        if self.key is None:
+            return None
+
+        fingerprint = hashlib.sha256(
+            f"{scope}\n{payload.model_dump_json()}".encode()
+        ).hexdigest()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(
+            settings.idempotency_wait_timeout_ms / 1000,
+            settings.idempotency_in_progress_timeout_seconds,
+        )
+
+        while True:
+            inserted, row = await self._claim(fingerprint)
+            if inserted is not None:
+                self._owned = True
+                self._owned_at = inserted.created_at
+                self._fingerprint = fingerprint
+                self._event = asyncio.Event()
+                _key_events[self.key] = self._event
+                return None
+
+            if row is not None:
+                if row.fingerprint != fingerprint:
+                    raise ConflictError(
+                        "Idempotency-Key was already used for a different "
+                        "request"
+                        )
+                if row.status_code is not None:
+                    return StoredResponse(status_code=row.status_code,
+                                          body=row.response_body)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise self._in_progress()
+            await self._wait(min(remaining,
+                                 settings.idempotency_poll_interval_ms / 1000))
+
+    async def _claim(self, fingerprint: str) -> tuple[Any, Any]:
+        tbl = IdempotencyKey.__table__
+        expired = func.now() - timedelta(
+            seconds=settings.idempotency_ttl_seconds
+            )
+        abandoned = func.now() - timedelta(
+            seconds=settings.idempotency_in_progress_timeout_seconds
+            )
+
+        stmt = insert(tbl).values(key=self.key, fingerprint=fingerprint)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tbl.c.key],
+            set_={
+                "fingerprint": stmt.excluded.fingerprint,
+                "status_code": None,
+                "response_body": None,
+                "created_at": func.now(),
+            },
+            where=or_(
+                tbl.c.created_at < expired,
+                and_(tbl.c.status_code.is_(None),
+                     tbl.c.created_at < abandoned),
+            ),
+        ).returning(tbl.c.created_at)
+
+        # the row is only locked while its owner commits the response,
+        # so never wait on it for long
+        await self.session.execute(select(func.set_config(
+            "lock_timeout",
+            f"{settings.idempotency_lock_timeout_ms}ms",
+            True,
+        )))
+        try:
+            inserted = (await self.session.execute(stmt)).first()
+            row = None
+            if inserted is None:
+                row = (await self.session.execute(
+                    select(tbl.c.fingerprint,
+                           tbl.c.status_code,
+                           tbl.c.response_body)
+                    .where(tbl.c.key == self.key)
+                )).first()
+            # ends the transaction, handing the connection back while
+            # the caller waits
+            await self.session.commit()
+        except DBAPIError as e:
+            await self.session.rollback()
+            if getattr(e.orig, "pgcode", None) == LOCK_NOT_AVAILABLE:
+                return None, None
+            raise
+        return inserted, row
+
+    async def _wait(self, timeout: float) -> None:
+        event = _key_events.get(self.key)
+        if event is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def complete(self, status_code: int, body: BaseModel) -> None:
+        if not self._owned:
+            return
+
+        result = await self.session.execute(
+            update(IdempotencyKey)
+            .where(self._still_owned())
+            .values(status_code=status_code,
+                    response_body=body.model_dump(mode="json"))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            # a retry took the key over after the in-progress timeout;
+            # committing now would duplicate its write
+            await self.session.rollback()
+            self._owned = False
+            raise self._in_progress()
+
+    async def release(self) -> None:
+        if self._owned:
+            # deletes nothing once the caller has committed the response
+            await self.session.rollback()
+            await self.session.execute(
+                delete(IdempotencyKey)
+                .where(self._still_owned())
+                .execution_options(synchronize_session=False)
+            )
+            await self.session.commit()
+            self._owned = False
+        self._wake()
+
+    def _still_owned(self) -> ColumnElement[bool]:
+        return and_(IdempotencyKey.key == self.key,
+                    IdempotencyKey.status_code.is_(None),
+                    IdempotencyKey.created_at == self._owned_at,
+                    IdempotencyKey.fingerprint == self._fingerprint)
+
+    def _wake(self) -> None:
+        if self._event is None:
+            return
+        if _key_events.get(self.key) is self._event:
+            del _key_events[self.key]
+        self._event.set()
+        self._event = None
+
+    async def sweep(self) -> int:
+        result = await self.session.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.created_at < func.now() - timedelta(
+                    seconds=settings.idempotency_ttl_seconds
+                    )
+            ).execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    def _in_progress(self) -> ConflictError:
+        return ConflictError(
+            "A request with this Idempotency-Key is in progress",
+            retry_after=settings.idempotency_retry_after_seconds,
+        )